@@ -1,7 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, current_app
 import os
 from .services.aemet_service import AEMET_Client
 from .services.weather_utils import Weather_Utils
+from .services.live_feed import Live_Feed
+from .services.response_cache import Response_Cache
 import pandas as pd
 from dotenv import load_dotenv
 load_dotenv()
@@ -12,6 +14,8 @@ api_blueprint = Blueprint('api', __name__)
 
 weather_utils = Weather_Utils()
 aemet_client = AEMET_Client(api_key = os.getenv('AEMET_API_KEY'))
+live_feed = Live_Feed(aemet_client, weather_utils, poll_interval = int(os.getenv('LIVE_POLL_INTERVAL', 600)))
+response_cache = Response_Cache(max_bytes = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)))
 
 @api_blueprint.route('/')
 def home():
@@ -36,6 +40,12 @@ def get_weather():
 
     print(f"Converted dates to UTC timezone: init_date: {init_date_str}, end_date: {end_date_str}")
 
+    # Same station, range, features and aggregation, the already serialized response is reused
+    cache_key = response_cache.make_key(station, init_date_str, end_date_str, desired_features, aggregation_value)
+    cached_body = response_cache.get(cache_key)
+    if cached_body is not None:
+        return Response(cached_body, mimetype='application/json')
+
     raw_data = aemet_client.get_weather_data(
         init_date_str,
         end_date_str,
@@ -52,4 +62,31 @@ def get_weather():
     if df is None:
         return jsonify({"error": "Data processing error"}), 500
 
-    return jsonify(df.reset_index().to_dict(orient="records"))
+    body = current_app.json.dumps(df.reset_index().to_dict(orient="records")).encode('utf-8')
+    response_cache.set(cache_key, body, end_date_str)
+    return Response(body, mimetype='application/json')
+
+
+@api_blueprint.route('/weather/cache', methods=['GET'])
+def get_cache_stats():
+    return jsonify(response_cache.stats())
+
+@api_blueprint.route('/weather/live', methods=['GET'])
+def get_weather_live():
+    station = request.args.get('station')
+    aggregation_value = request.args.get('aggregation_value', None)     # None for observations, 'hourly' for aggregates
+
+    if not station:
+        return jsonify({"error": "Missing basic parameters, station"}), 400
+
+    try:
+        subscriber = live_feed.subscribe(station, aggregation_value, request.headers.get('Last-Event-ID'))     # Sent by the browser when reconnecting
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Every connected client shares the same upstream poll of the station
+    return Response(
+        live_feed.stream(subscriber),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
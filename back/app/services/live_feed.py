@@ -0,0 +1,188 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+class Live_Feed:
+    def __init__(self, aemet_client, weather_utils, poll_interval=600, lookback_hours=24, queue_size=50, keepalive=15, retry=3000):
+        self.aemet_client = aemet_client
+        self.weather_utils = weather_utils
+        self.poll_interval = poll_interval      # AEMET publishes a new observation every 10 minutes
+        self.lookback_hours = lookback_hours    # Window requested on every poll, so late observations are not lost
+        self.queue_size = queue_size            # Max pending events per subscriber, also the events kept to resume a reconnection
+        self.keepalive = keepalive              # Seconds between SSE comments to keep idle connections open
+        self.retry = retry                      # Milliseconds the browser waits before reconnecting
+        self.allowed_aggregations = [None, 'hourly']
+        self.lock = threading.Lock()
+        self.event_id = 0   # Shared by every channel, so an id from a stopped feed is never valid in a new one
+        self.feeds = {}     # station -> {"channels": {aggregation: channel state, see _new_channel}, "thread": Thread}
+
+    """ FUNCTION TO REGISTER A NEW SUBSCRIBER. STARTS THE UPSTREAM POLLER OF THE STATION IF IT IS THE FIRST ONE """
+    def subscribe(self, station, aggregation_value=None, last_event_id=None):
+        if aggregation_value not in self.allowed_aggregations:
+            raise ValueError(f"Aggregation '{aggregation_value}' not supported for live feed. Choose from ['hourly'] or None.")
+        subscriber = {"key": (station, aggregation_value), "queue": queue.Queue(maxsize=self.queue_size), "primed": False}
+        with self.lock:
+            feed = self.feeds.setdefault(station, {"channels": {}, "thread": None})
+            channel = feed["channels"].setdefault(aggregation_value, self._new_channel())
+            channel["subscribers"][id(subscriber)] = subscriber
+            # Every subscriber starts from the current snapshot, or resumes from the last event it received
+            if channel["snapshot"] is not None:
+                self._catch_up(channel, subscriber, last_event_id)
+            # Only one upstream poller per station, no matter the aggregations or how many clients are connected
+            if feed["thread"] is None or not feed["thread"].is_alive():
+                feed["thread"] = threading.Thread(target=self._poll_loop, args=(station,), daemon=True)
+                feed["thread"].start()
+        return subscriber
+
+    """ FUNCTION TO REMOVE A SUBSCRIBER, THE POLLER STOPS BY ITSELF WHEN NOBODY IS LISTENING """
+    def unsubscribe(self, subscriber):
+        station, aggregation_value = subscriber["key"]
+        with self.lock:
+            feed = self.feeds.get(station)
+            if feed is not None and aggregation_value in feed["channels"]:
+                feed["channels"][aggregation_value]["subscribers"].pop(id(subscriber), None)
+
+    """ FUNCTION TO OBTAIN THE NEW OR UPDATED RECORDS OF EVERY CHANNEL OF A STATION, FROM A SINGLE UPSTREAM REQUEST """
+    def poll_once(self, station):
+        end_utc = self._now()
+        # Aligned to the hour, otherwise the oldest hourly bucket would be partial and change on every poll
+        init_utc = (end_utc - timedelta(hours=self.lookback_hours)).replace(minute=0, second=0)
+
+        with self.lock:
+            feed = self.feeds.get(station)
+            aggregations = list(feed["channels"]) if feed is not None else []
+        if not aggregations:
+            return {}
+
+        raw_data = self.aemet_client.get_weather_data(
+            self.weather_utils.format_aemet_date(init_utc),
+            self.weather_utils.format_aemet_date(end_utc),
+            station
+        )
+        if raw_data is None:
+            return {}
+
+        results = {}
+        for aggregation_value in aggregations:
+            df = self.weather_utils.process_aemet_data(raw_data, [], aggregation_value)
+            if df is None:
+                continue
+            with self.lock:
+                channel = self.feeds.get(station, {"channels": {}})["channels"].get(aggregation_value)
+                if channel is None:
+                    continue
+                last_sent = {}
+                # New observations, or hourly aggregates whose values changed since they were last sent
+                records = []
+                for record in df.to_dict(orient="records"):
+                    serialized = json.dumps(record, default=str)    # Compared serialized, NaN != NaN would resend every row
+                    if channel["last_sent"].get(record["fhora"]) != serialized:
+                        records.append(record)
+                    last_sent[record["fhora"]] = serialized
+                # Rows that already left the lookback window are forgotten
+                channel["last_sent"] = last_sent
+                channel["snapshot_data"] = "[" + ", ".join(last_sent.values()) + "]"
+            results[aggregation_value] = records
+        return results
+
+    """ FUNCTION TO SEND ONE EVENT TO EVERY SUBSCRIBER OF A CHANNEL """
+    def publish(self, station, aggregation_value, records):
+        with self.lock:
+            channel = self.feeds.get(station, {"channels": {}})["channels"].get(aggregation_value)
+            if channel is None or channel["snapshot_data"] is None:
+                return
+            priming = channel["snapshot"] is None
+            if not records and not priming:
+                return
+
+            self.event_id += 1
+            # Serialized once, every subscriber queue receives the same strings
+            channel["snapshot"] = f"id: {self.event_id}\nevent: snapshot\ndata: {channel['snapshot_data']}\n\n"
+            if priming:
+                # The first poll is the initial state, not a change, so it is only sent as a snapshot
+                channel["history_floor"] = self.event_id
+                payload = channel["snapshot"]
+            else:
+                payload = f"id: {self.event_id}\ndata: {json.dumps(records, default=str)}\n\n"
+                if len(channel["history"]) == channel["history"].maxlen:
+                    channel["history_floor"] = channel["history"][0][0]
+                channel["history"].append((self.event_id, payload))
+
+            for subscriber in channel["subscribers"].values():
+                if subscriber["primed"]:
+                    self._deliver(channel, subscriber, payload)
+                else:
+                    self._deliver(channel, subscriber, channel["snapshot"])
+                    subscriber["primed"] = True
+
+    """ GENERATOR WITH THE SSE STREAM OF A SUBSCRIBER, TO BE RETURNED AS THE RESPONSE BODY """
+    def stream(self, subscriber):
+        try:
+            # Sent right away, so the headers are flushed and the connection opens without waiting for an event
+            yield f"retry: {self.retry}\n\n"
+            while True:
+                try:
+                    yield subscriber["queue"].get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _now(self):
+        return datetime.now(ZoneInfo("UTC")).replace(microsecond=0)
+
+    def _new_channel(self):
+        return {
+            "subscribers": {},
+            "last_sent": {},                            # fhora -> serialized record, as in the latest poll
+            "snapshot_data": None,                      # Serialized list with every record of the latest poll
+            "snapshot": None,                           # SSE event with the snapshot, sent to subscribers starting from scratch
+            "history": deque(maxlen=self.queue_size),   # Latest (id, SSE event) deltas, to resume reconnections
+            "history_floor": None                       # Subscribers that received this id or later can be resumed
+        }
+
+    def _catch_up(self, channel, subscriber, last_event_id):
+        try:
+            last_event_id = int(last_event_id)
+        except (TypeError, ValueError):
+            last_event_id = None
+        if last_event_id is not None and channel["history_floor"] <= last_event_id <= self.event_id:
+            for event_id, payload in channel["history"]:
+                if event_id > last_event_id:
+                    subscriber["queue"].put_nowait(payload)
+        else:
+            subscriber["queue"].put_nowait(channel["snapshot"])
+        subscriber["primed"] = True
+
+    def _deliver(self, channel, subscriber, payload):
+        try:
+            subscriber["queue"].put_nowait(payload)
+        except queue.Full:
+            # Backpressure: a consumer that cannot keep up has its pending deltas replaced by the latest snapshot
+            while True:
+                try:
+                    subscriber["queue"].get_nowait()
+                except queue.Empty:
+                    break
+            subscriber["queue"].put_nowait(channel["snapshot"])
+
+    def _poll_loop(self, station):
+        while True:
+            with self.lock:
+                feed = self.feeds.get(station)
+                if feed is not None:
+                    # Aggregations nobody listens to anymore are not processed, a new subscriber primes them again
+                    feed["channels"] = {aggregation_value: channel for aggregation_value, channel in feed["channels"].items() if channel["subscribers"]}
+                if feed is None or not feed["channels"]:
+                    self.feeds.pop(station, None)
+                    return
+            try:
+                for aggregation_value, records in self.poll_once(station).items():
+                    self.publish(station, aggregation_value, records)
+            except Exception as e:
+                print(f"Live feed poll failed for {station}: {str(e)}")
+            time.sleep(self.poll_interval)
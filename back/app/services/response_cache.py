@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+class Response_Cache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, closed_ttl=24 * 3600, open_ttl=600, settle_hours=6):
+        self.max_bytes = max_bytes          # Total size of the cached bodies, least recently used are evicted first
+        self.closed_ttl = closed_ttl        # Ranges that ended more than settle_hours ago, AEMET data will not change anymore
+        self.open_ttl = open_ttl            # Recent ranges, AEMET publishes every 10 minutes and some observations arrive late
+        self.settle_hours = settle_hours    # Time after the end of a range before it is considered closed
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()        # key -> (body, expires_at)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    """ FUNCTION TO NORMALIZE A QUERY INTO A CACHE KEY. DATES MUST BE THE UTC ONES OBTAINED FROM madrid_dates_to_aemet_utc """
+    @staticmethod
+    def make_key(station, init_date_utc, end_date_utc, desired_features, aggregation_value):
+        return (station, init_date_utc, end_date_utc, tuple(sorted(set(desired_features or []))), aggregation_value)
+
+    """ FUNCTION TO OBTAIN A CACHED BODY, NONE IF MISSING OR EXPIRED """
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    """ FUNCTION TO STORE A SERIALIZED BODY, THE TTL DEPENDS ON WHETHER THE RANGE IS CLOSED. END DATE IN AEMET UTC FORMAT """
+    def set(self, key, body, end_date_utc):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        end_date_utc = datetime.strptime(end_date_utc, "%Y-%m-%dT%H:%M:%SUTC").replace(tzinfo=timezone.utc)
+        closed = end_date_utc < datetime.now(timezone.utc) - timedelta(hours=self.settle_hours)
+        ttl = self.closed_ttl if closed else self.open_ttl
+
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (body, time.monotonic() + ttl)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def _remove(self, key):
+        body, _ = self.entries.pop(key)
+        self.current_bytes -= len(body)
@@ -1,6 +1,6 @@
 import pytest
 from app import create_app
-from app.routes import aemet_client, weather_utils
+from app.routes import aemet_client, weather_utils, response_cache
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -8,6 +8,7 @@ load_dotenv()
 def client():
     app = create_app()
     app.config['TESTING'] = True
+    response_cache.clear()      # Every test starts without cached responses
     with app.test_client() as client:
         yield client
 
@@ -101,4 +102,38 @@ def test_real_process(client):
     2024-01-01 01:20:00+01:00  JCI Estacion meteorologica  2.4  990.9  1.3 = {'fhora': 'Mon, 01 Jan 2024 00:20:00 GMT', 'nombre': 'JCI Estacion meteorologica', 'pres': 990.9, 'temp': 2.4, 'vel': 1.3}
     2024-01-01 01:30:00+01:00  JCI Estacion meteorologica  2.4  991.1  0.9 = {'fhora': 'Mon, 01 Jan 2024 00:30:00 GMT', 'nombre': 'JCI Estacion meteorologica', 'pres': 991.1, 'temp': 2.4, 'vel': 0.9}
     2024-01-01 01:40:00+01:00  JCI Estacion meteorologica  2.3  991.2  1.4 = {'fhora': 'Mon, 01 Jan 2024 00:40:00 GMT', 'nombre': 'JCI Estacion meteorologica', 'pres': 991.2, 'temp': 2.3, 'vel': 1.4}
-    """
\ No newline at end of file
+    """
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        ({}),                                                             # missing station
+        ({'station': '89064', 'aggregation_value': 'daily'})              # aggregation not supported live
+    ]
+)
+def test_weather_live_invalid_params(client, params):
+    # Case 4, test live feed rejects invalid parameters before opening the stream
+    res = client.get("/api/weather/live", query_string=params)
+    assert res.status_code == 400
+
+def test_weather_cached_response(client, monkeypatch):
+    # Case 5, the same normalized query is served from the cache without calling AEMET again
+    calls = []
+    def mock_get_weather_data(start, end, station):
+        calls.append(station)
+        return [{"fhora": "2024-01-01T00:00:00UTC", "nombre": "Station1", "temp": 10, "pres": 990, "vel": 1}]
+
+    monkeypatch.setattr(aemet_client, "get_weather_data", mock_get_weather_data)
+
+    params = {'station': '89064', 'init_date': '2024-01-01', 'end_date': '2024-01-02'}
+    first = client.get("/api/weather", query_string={**params, 'desired_features[]': ['vel', 'temp']})
+    second = client.get("/api/weather", query_string={**params, 'desired_features[]': ['temp', 'vel']})
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert first.get_data() == second.get_data()
+    assert len(calls) == 1
+
+    stats = client.get("/api/weather/cache").get_json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
@@ -0,0 +1,169 @@
+import pytest
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from app.services.live_feed import Live_Feed
+from app.services.weather_utils import Weather_Utils
+
+STATION = "89064"
+
+@pytest.fixture
+def mock_aemet():
+    aemet = MagicMock()
+    aemet.get_weather_data.return_value = [
+        {"fhora": "2024-01-01T00:00:00UTC", "nombre": "Station1", "temp": 2.4, "pres": 990.8, "vel": 1.3},
+        {"fhora": "2024-01-01T00:10:00UTC", "nombre": "Station1", "temp": 2.3, "pres": 990.9, "vel": 1.1}
+    ]
+    return aemet
+
+@pytest.fixture
+def live_feed(mock_aemet):
+    feed = Live_Feed(mock_aemet, Weather_Utils(), queue_size=2, keepalive=0.01)
+    feed._poll_loop = lambda station: None      # No background poller, polls are triggered by hand
+    return feed
+
+def test_subscribe_invalid_aggregation(live_feed):
+    # Case 1, only observations or hourly aggregates can be streamed
+    with pytest.raises(ValueError):
+        live_feed.subscribe(STATION, 'monthly')
+
+def poll(live_feed, station=STATION):
+    for aggregation_value, records in live_feed.poll_once(station).items():
+        live_feed.publish(station, aggregation_value, records)
+
+def new_observation(mock_aemet, fhora, temp):
+    mock_aemet.get_weather_data.return_value = mock_aemet.get_weather_data.return_value + [
+        {"fhora": fhora, "nombre": "Station1", "temp": temp, "pres": 991.0, "vel": 0.9}
+    ]
+
+def event_data(payload):
+    return json.loads(payload.split("data: ", 1)[1])
+
+def test_first_poll_is_a_shared_snapshot(live_feed, mock_aemet):
+    # Case 2, one upstream poll fans out the same snapshot to every subscriber, never as a delta
+    subscribers = [live_feed.subscribe(STATION) for _ in range(3)]
+    poll(live_feed)
+
+    assert mock_aemet.get_weather_data.call_count == 1
+    payloads = [subscriber["queue"].get_nowait() for subscriber in subscribers]
+    assert all(payload is payloads[0] for payload in payloads)
+    assert "event: snapshot" in payloads[0]
+    assert len(event_data(payloads[0])) == 2
+
+def test_late_subscriber_starts_from_snapshot(live_feed, mock_aemet):
+    # Case 3, a subscriber joining an existing feed gets the same state as the first one
+    first = live_feed.subscribe(STATION)
+    poll(live_feed)
+    new_observation(mock_aemet, "2024-01-01T00:20:00UTC", 2.2)
+    poll(live_feed)
+
+    late = live_feed.subscribe(STATION)
+    snapshot = late["queue"].get_nowait()
+    assert "event: snapshot" in snapshot
+    assert len(event_data(snapshot)) == 3
+
+    first["queue"].get_nowait()
+    delta = first["queue"].get_nowait()
+    assert "event: snapshot" not in delta
+    assert [record["temp"] for record in event_data(delta)] == [2.2]
+
+def test_only_new_records_are_sent(live_feed, mock_aemet):
+    # Case 4, a second poll only sends observations not seen before
+    live_feed.subscribe(STATION)
+    assert len(live_feed.poll_once(STATION)[None]) == 2
+    assert live_feed.poll_once(STATION)[None] == []
+
+    new_observation(mock_aemet, "2024-01-01T00:20:00UTC", 2.2)
+    records = live_feed.poll_once(STATION)[None]
+    assert len(records) == 1
+    assert records[0]["temp"] == 2.2
+
+def test_updated_hourly_aggregate_is_resent(live_feed, mock_aemet):
+    # Case 5, an hourly aggregate is sent again when a new observation changes its mean
+    live_feed.subscribe(STATION, 'hourly')
+    assert len(live_feed.poll_once(STATION)['hourly']) == 1
+
+    new_observation(mock_aemet, "2024-01-01T00:20:00UTC", 2.2)
+    records = live_feed.poll_once(STATION)['hourly']
+    assert len(records) == 1
+    assert records[0]["temp"] == pytest.approx(2.3)
+
+def test_reconnection_resumes_from_last_event_id(live_feed, mock_aemet):
+    # Case 6, a reconnecting subscriber receives only the events it missed
+    subscriber = live_feed.subscribe(STATION)
+    poll(live_feed)
+    snapshot_id = subscriber["queue"].get_nowait().split("\n", 1)[0][len("id: "):]
+    live_feed.unsubscribe(subscriber)
+
+    live_feed.subscribe(STATION)        # Keeps the feed alive
+    new_observation(mock_aemet, "2024-01-01T00:20:00UTC", 2.2)
+    poll(live_feed)
+    new_observation(mock_aemet, "2024-01-01T00:30:00UTC", 2.1)
+    poll(live_feed)
+
+    resumed = live_feed.subscribe(STATION, last_event_id=snapshot_id)
+    missed = [resumed["queue"].get_nowait() for _ in range(2)]
+    assert resumed["queue"].empty()
+    assert [event_data(payload)[0]["temp"] for payload in missed] == [2.2, 2.1]
+
+    unknown = live_feed.subscribe(STATION, last_event_id="0")
+    assert "event: snapshot" in unknown["queue"].get_nowait()
+
+def test_slow_subscriber_gets_snapshot(live_feed, mock_aemet):
+    # Case 7, a subscriber with a full queue has its pending deltas replaced by the latest snapshot
+    slow = live_feed.subscribe(STATION)
+    poll(live_feed)
+    for minute in range(20, 40, 10):
+        new_observation(mock_aemet, f"2024-01-01T00:{minute}:00UTC", 2.0)
+        poll(live_feed)
+
+    channel = live_feed.feeds[STATION]["channels"][None]
+    pending = [slow["queue"].get_nowait() for _ in range(slow["queue"].qsize())]
+    assert pending[0] is channel["snapshot"]
+    assert len(event_data(pending[0])) == 4
+    assert len(pending) == 1
+    assert id(slow) in channel["subscribers"]
+
+def test_stream_opens_immediately_and_unsubscribes(live_feed):
+    # Case 8, the stream writes right away, idle streams send keepalives and closing removes the subscriber
+    subscriber = live_feed.subscribe(STATION)
+    stream = live_feed.stream(subscriber)
+    assert next(stream).startswith("retry: ")
+    assert next(stream) == ": keepalive\n\n"
+    stream.close()
+
+    assert live_feed.feeds[STATION]["channels"][None]["subscribers"] == {}
+
+def test_one_upstream_poll_per_station(live_feed, mock_aemet):
+    # Case 9, observation and hourly subscribers of a station share the same upstream request
+    observations = live_feed.subscribe(STATION)
+    hourly = live_feed.subscribe(STATION, 'hourly')
+    poll(live_feed)
+
+    assert mock_aemet.get_weather_data.call_count == 1
+    assert len(event_data(observations["queue"].get_nowait())) == 2
+    assert len(event_data(hourly["queue"].get_nowait())) == 1
+
+def test_hourly_window_aligned_to_the_hour(live_feed, mock_aemet):
+    # Case 10, the oldest hourly bucket stays complete while the lookback window slides
+    start = datetime(2024, 1, 1, 0, 0, tzinfo=timezone.utc)
+    rows = [
+        {"fhora": (start + timedelta(minutes=10 * i)).strftime("%Y-%m-%dT%H:%M:%SUTC"), "nombre": "Station1", "temp": float(i), "pres": 990.0, "vel": 1.0}
+        for i in range(6 * 28)
+    ]
+    def get_weather_data(init_date, end_date, station):
+        # Only the rows inside the requested window, as AEMET does
+        return [row for row in rows if init_date <= row["fhora"] <= end_date]
+    mock_aemet.get_weather_data.side_effect = get_weather_data
+
+    hourly = live_feed.subscribe(STATION, 'hourly')
+    live_feed._now = lambda: datetime(2024, 1, 2, 3, 5, tzinfo=timezone.utc)
+    poll(live_feed)
+    snapshot = event_data(hourly["queue"].get_nowait())
+    assert snapshot[0]["fhora"] == "2024-01-01T04:00:00+0100"
+    assert snapshot[0]["temp"] == pytest.approx(20.5)      # Mean of the six observations of 03:00Z
+
+    live_feed._now = lambda: datetime(2024, 1, 2, 3, 15, tzinfo=timezone.utc)
+    poll(live_feed)
+    delta = event_data(hourly["queue"].get_nowait())
+    assert [record["fhora"] for record in delta] == ["2024-01-02T04:00:00+0100"]
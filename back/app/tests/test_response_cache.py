@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+from app.services.response_cache import Response_Cache
+
+CLOSED_RANGE = ("2023-12-31T23:00:00UTC", "2024-01-31T22:59:59UTC")
+OPEN_RANGE = ("2024-01-01T00:00:00UTC", "2999-12-31T22:59:59UTC")
+
+@pytest.fixture
+def cache():
+    return Response_Cache(max_bytes=10, closed_ttl=100, open_ttl=10)
+
+def test_key_is_normalized():
+    # Case 1, feature order and duplicates do not change the key
+    key_a = Response_Cache.make_key("89064", *CLOSED_RANGE, ['vel', 'temp'], 'hourly')
+    key_b = Response_Cache.make_key("89064", *CLOSED_RANGE, ['temp', 'vel', 'temp'], 'hourly')
+    assert key_a == key_b
+    assert key_a != Response_Cache.make_key("89064", *CLOSED_RANGE, ['temp'], 'hourly')
+
+def test_hit_and_miss_counters(cache):
+    # Case 2, first lookup misses and after storing it hits
+    key = cache.make_key("89064", *CLOSED_RANGE, [], None)
+    assert cache.get(key) is None
+    cache.set(key, b"[]", CLOSED_RANGE[1])
+    assert cache.get(key) == b"[]"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["bytes"] == 2
+
+def test_lru_eviction_by_size(cache):
+    # Case 3, least recently used entries are evicted once the byte limit is exceeded
+    key_a = cache.make_key("89064", *CLOSED_RANGE, [], None)
+    key_b = cache.make_key("89064", *CLOSED_RANGE, [], 'hourly')
+    key_c = cache.make_key("89064", *CLOSED_RANGE, [], 'daily')
+    cache.set(key_a, b"aaaa", CLOSED_RANGE[1])
+    cache.set(key_b, b"bbbb", CLOSED_RANGE[1])
+    cache.get(key_a)                # key_b becomes the least recently used
+    cache.set(key_c, b"cccc", CLOSED_RANGE[1])
+
+    assert cache.get(key_b) is None
+    assert cache.get(key_a) == b"aaaa"
+    assert cache.get(key_c) == b"cccc"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 8
+
+def test_oversized_body_not_stored(cache):
+    # Case 4, a body bigger than the whole cache is never stored
+    key = cache.make_key("89064", *CLOSED_RANGE, [], None)
+    cache.set(key, b"x" * 11, CLOSED_RANGE[1])
+    assert cache.get(key) is None
+    assert cache.stats()["bytes"] == 0
+
+def test_ttl_depends_on_closed_range(cache):
+    # Case 5, open ranges expire sooner than closed ones
+    closed_key = cache.make_key("89064", *CLOSED_RANGE, [], None)
+    open_key = cache.make_key("89064", *OPEN_RANGE, [], None)
+    with patch("app.services.response_cache.time.monotonic", return_value=0):
+        cache.set(closed_key, b"[1]", CLOSED_RANGE[1])
+        cache.set(open_key, b"[2]", OPEN_RANGE[1])
+
+    with patch("app.services.response_cache.time.monotonic", return_value=50):
+        assert cache.get(open_key) is None
+        assert cache.get(closed_key) == b"[1]"
+
+    with patch("app.services.response_cache.time.monotonic", return_value=150):
+        assert cache.get(closed_key) is None
+    assert cache.stats()["entries"] == 0
+
+def test_recent_range_is_not_closed(cache):
+    # Case 6, a range that just ended keeps the short TTL until AEMET late observations settle
+    recent_end = (datetime.now(timezone.utc) - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SUTC")
+    key = cache.make_key("89064", CLOSED_RANGE[0], recent_end, [], None)
+    with patch("app.services.response_cache.time.monotonic", return_value=0):
+        cache.set(key, b"[1]", recent_end)
+
+    with patch("app.services.response_cache.time.monotonic", return_value=50):
+        assert cache.get(key) is None